@@ -1,20 +1,29 @@
 import os
+import hashlib
 import sqlite3
 import pytest
+from user_functions import SCHEMA_VERSION
 from user_functions import create_database
 from user_functions import is_valid_password
 from user_functions import is_valid_email
+from user_functions import validate_batch
 from user_functions import hash_password
+from user_functions import hash_passwords
 from user_functions import register_user
+from user_functions import register_users
 from user_functions import activate_user
+from user_functions import activate_users
 from user_functions import authenticate_user
+from user_functions import make_authenticator
 from user_functions import reset_password
+from user_functions import close_connections
 
 
 @pytest.fixture
 def temp_db_path(tmp_path):
-    """Fixture to create a temporary database path."""
-    return tmp_path / "tests.db"
+    """Fixture to create a temporary database path and close the shared connections after the test."""
+    yield tmp_path / "tests.db"
+    close_connections()
 
 @pytest.fixture
 def db_connection(temp_db_path):
@@ -36,6 +45,146 @@ def test_users_table_created(db_connection):
     table_exists = cursor.fetchone()
     assert table_exists is not None
 
+def test_database_journal_mode(db_connection):
+    """Test if the database uses write-ahead logging."""
+    cursor = db_connection.cursor()
+    cursor.execute("PRAGMA journal_mode")
+    assert cursor.fetchone()[0] == "wal"
+
+def test_schema_version(temp_db_path):
+    """Test if the schema version is recorded and creating the database again is a no-op."""
+    create_database(temp_db_path)
+    register_user(temp_db_path, "versioned@example.com", "Password123!")
+    create_database(temp_db_path)
+
+    conn = sqlite3.connect(temp_db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+    conn.close()
+
+def create_legacy_database(db_path, users):
+    """Create a database with the schema used before schema versioning, with unsalted SHA-256 password hashes."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            is_active BOOLEAN NOT NULL DEFAULT FALSE,
+            registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            activation_date TIMESTAMP NULL
+        )
+    ''')
+    for email, password in users:
+        conn.execute("INSERT INTO users (email, password, is_active, activation_date) "
+                     "VALUES (?, ?, ?, '2024-01-02 03:04:05')",
+                     (email, hashlib.sha256(password.encode()).hexdigest(), True))
+    conn.commit()
+    conn.close()
+
+def test_migrate_legacy_database(temp_db_path):
+    """Test if a database created before schema versioning is migrated."""
+    email = "legacy@example.com"
+    password = "Password123!"
+
+    # Pre-setup: Create a database with the legacy schema and an unsalted SHA-256 password hash
+    create_legacy_database(temp_db_path, [(email, password)])
+
+    create_database(temp_db_path)
+
+    # Test that the dates are converted and the schema version is recorded
+    conn = sqlite3.connect(temp_db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    registration_date, activation_date = conn.execute(
+        "SELECT registration_date, activation_date FROM users WHERE email = ?", (email,)).fetchone()
+    assert isinstance(registration_date, int)
+    assert activation_date == 1704164645
+
+    # Test that the migrated user can log in, and that the legacy hash is replaced with a salted one
+    success, message = authenticate_user(temp_db_path, "nonexistent@example.com", password)
+    assert not success, "Authentication should fail with invalid email after migration"
+    success, message = authenticate_user(temp_db_path, email, "WrongPassword")
+    assert not success, "Authentication should fail with wrong password after migration"
+    success, message = authenticate_user(temp_db_path, email, password)
+    assert success, "Authentication should be successful with the legacy password after migration"
+    salt, = conn.execute("SELECT salt FROM users WHERE email = ?", (email,)).fetchone()
+    assert salt is not None
+    conn.close()
+
+    success, message = authenticate_user(temp_db_path, email, password)
+    assert success, "Authentication should be successful after the password hash is upgraded"
+
+def test_migrate_legacy_database_keeps_ids(temp_db_path):
+    """Test if ids of deleted users are not reused after migrating a legacy database."""
+    # Pre-setup: Create a legacy database with three users and delete the last one
+    create_legacy_database(temp_db_path, [("first@example.com", "Password123!"),
+                                          ("second@example.com", "Password123!"),
+                                          ("third@example.com", "Password123!")])
+    conn = sqlite3.connect(temp_db_path)
+    conn.execute("DELETE FROM users WHERE id = 3")
+    conn.commit()
+    conn.close()
+
+    create_database(temp_db_path)
+    register_user(temp_db_path, "fourth@example.com", "Password123!")
+
+    conn = sqlite3.connect(temp_db_path)
+    new_id, = conn.execute("SELECT id FROM users WHERE email = ?", ("fourth@example.com",)).fetchone()
+    conn.close()
+    assert new_id == 4
+
+def test_migrate_legacy_database_keeps_references(temp_db_path):
+    """Test if foreign keys, views and triggers of the users table still work after migrating a legacy database."""
+    # Pre-setup: Create a legacy database with a table, a view and a trigger referring to the users table
+    create_legacy_database(temp_db_path, [("referenced@example.com", "Password123!")])
+    conn = sqlite3.connect(temp_db_path)
+    conn.execute("CREATE TABLE sessions (id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users(id))")
+    conn.execute("CREATE VIEW active AS SELECT id, email FROM users WHERE is_active = 1")
+    conn.execute("CREATE TABLE activations (email TEXT)")
+    conn.execute("CREATE TRIGGER log_activation AFTER UPDATE OF is_active ON users "
+                 "BEGIN INSERT INTO activations VALUES (new.email); END")
+    conn.execute("INSERT INTO sessions (user_id) VALUES (1)")
+    conn.commit()
+    conn.close()
+
+    create_database(temp_db_path)
+
+    # Test that the schema only refers to the users table
+    conn = sqlite3.connect(temp_db_path)
+    schema = " ".join(sql for sql, in conn.execute("SELECT sql FROM sqlite_master WHERE sql IS NOT NULL"))
+    assert "users_legacy" not in schema
+    assert "users_new" not in schema
+
+    # Test that the view and the foreign key still resolve to the migrated users
+    assert conn.execute("SELECT email FROM active").fetchall() == [("referenced@example.com",)]
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    conn.close()
+
+    # Test that the trigger was recreated on the migrated users table
+    activate_user(temp_db_path, "referenced@example.com")
+    conn = sqlite3.connect(temp_db_path)
+    assert conn.execute("SELECT email FROM activations").fetchall() == [("referenced@example.com",)]
+    conn.close()
+
+def test_migrate_legacy_database_case_conflict(temp_db_path):
+    """Test if a legacy database with emails differing only by case is reported and left unchanged."""
+    # Pre-setup: Create a legacy database with two emails that differ only by case
+    create_legacy_database(temp_db_path, [("Conflict@example.com", "Password123!"),
+                                          ("conflict@example.com", "Password456!"),
+                                          ("other@example.com", "Password123!")])
+
+    with pytest.raises(sqlite3.IntegrityError) as excinfo:
+        create_database(temp_db_path)
+    assert "Conflict@example.com" in str(excinfo.value)
+    assert "conflict@example.com" in str(excinfo.value)
+    assert "other@example.com" not in str(excinfo.value)
+
+    # Test that the database was not migrated
+    conn = sqlite3.connect(temp_db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 3
+    conn.close()
+
 def test_is_valid_password():
     """Test if passwords are validated correctly"""
     # Check if password is correct
@@ -55,25 +204,68 @@ def test_is_valid_email():
     assert not is_valid_email("info.notcorrect.com")
     # Check if empty email is invalid
     assert not is_valid_email("")
+    # Check if emails with dots and symbols in the local part and subdomains are valid
+    assert is_valid_email("first.last+tag@mail.example.co.uk")
+    # Check if emails without a local part or with a one-letter domain suffix are invalid
+    assert not is_valid_email("@correct.com")
+    assert not is_valid_email("info@correct.c")
+    # Check if emails with non-ASCII characters in the local part are invalid
+    assert not is_valid_email("inf\u00f6@correct.com")
     
+def test_validate_batch():
+    """Test if email and password pairs are validated correctly in bulk"""
+    emails = ["info@correct.com", "info.notcorrect.com", "info@correct.com"]
+    passwords = ["validpass%1", "validpass%1", "notvalidpass1"]
+    assert validate_batch(emails, passwords) == [True, False, False]
+    # Check if an empty batch is valid
+    assert validate_batch([], []) == []
+    # Check if batches of different lengths are rejected
+    with pytest.raises(ValueError):
+        validate_batch(emails, passwords[:2])
+
 def test_hash_password_behavior():
     """Test various behaviors of the hash_password function."""
     password = "my_password123!"
     another_password = "different_password456@"
+    salt = b"0123456789abcdef"
+    another_salt = b"fedcba9876543210"
 
-    # Test that hashing a password returns a string
-    hashed_password = hash_password(password)
-    assert isinstance(hashed_password, str)
+    # Test that hashing a password returns the raw 32-byte digest
+    hashed_password = hash_password(password, salt)
+    assert isinstance(hashed_password, bytes)
+    assert len(hashed_password) == 32
 
-    # Test that hashing the same password twice results in the same hash
-    hash1 = hash_password(password)
-    hash2 = hash_password(password)
+    # Test that hashing the same password twice with the same salt results in the same hash
+    hash1 = hash_password(password, salt)
+    hash2 = hash_password(password, salt)
     assert hash1 == hash2
 
     # Test that hashing different passwords results in different hashes
-    different_hash = hash_password(another_password)
+    different_hash = hash_password(another_password, salt)
     assert hashed_password != different_hash
 
+    # Test that hashing the same password with a different salt results in a different hash
+    salted_hash = hash_password(password, another_salt)
+    assert hashed_password != salted_hash
+
+def test_hash_passwords():
+    """Test hashing several passwords at once."""
+    passwords = ["first_password1!", "second_password2@", "first_password1!"]
+
+    results = hash_passwords(passwords)
+    assert len(results) == len(passwords)
+
+    # Test that every hash matches the password at the same position with its own salt
+    for password, (salt, hashed_password) in zip(passwords, results):
+        assert hashed_password == hash_password(password, salt)
+
+    # Test that identical passwords get different salts and therefore different hashes
+    assert results[0][0] != results[2][0]
+    assert results[0][1] != results[2][1]
+
+    # Test that an empty batch returns an empty list
+    assert hash_passwords([]) == []
+
 def test_register_user(temp_db_path):
     """Test user registration."""
 
@@ -104,6 +296,38 @@ def test_register_user(temp_db_path):
     assert not success, "Registration should fail with an already registered email"
     assert message == "Email already registered"
 
+    # Test registration with an already registered email in a different case
+    success, message = register_user(temp_db_path, valid_email.upper(), valid_password)
+    assert not success, "Registration should fail with an already registered email in a different case"
+    assert message == "Email already registered"
+
+def test_register_user_non_ascii_case(temp_db_path):
+    """Test that only ASCII letters are treated as case-insensitive in emails."""
+    password = "Password123!"
+    other_password = "Password456!"
+
+    create_database(temp_db_path)
+    register_user(temp_db_path, "a@b.com\u00c4", password)
+
+    # Test that emails differing only in the case of ASCII letters are the same user
+    success, message = register_user(temp_db_path, "A@B.COM\u00c4", password)
+    assert message == "Email already registered"
+
+    # Test that emails differing in the case of non-ASCII letters are different users
+    success, message = register_user(temp_db_path, "a@b.com\u00e4", other_password)
+    assert success, "Registration should be successful for an email differing in a non-ASCII letter"
+    success, message = register_user(temp_db_path, "a@b.com\u212a", password)
+    assert success, "Registration should be successful for an email with the Kelvin sign"
+    success, message = register_user(temp_db_path, "a@b.comk", password)
+    assert success, "Registration should be successful for an email with a plain k"
+
+    # Test that each user can be activated and authenticated with their own password
+    assert activate_user(temp_db_path, "a@b.com\u00e4") == (True, "User activated")
+    success, message = authenticate_user(temp_db_path, "a@b.com\u00e4", other_password)
+    assert success, "Authentication should be successful for an email differing in a non-ASCII letter"
+    success, message = authenticate_user(temp_db_path, "a@b.com\u00e4", password)
+    assert not success, "Authentication should fail with another user's password"
+
 def test_activate_user(temp_db_path):
     """Test user activation."""
     valid_email = "user@example.com"
@@ -123,6 +347,47 @@ def test_activate_user(temp_db_path):
     assert success, "Activation should be successful for an existing user"
     assert message == "User activated"
 
+    # Test that registration and activation dates are stored as Unix timestamps
+    conn = sqlite3.connect(temp_db_path)
+    registration_date, activation_date = conn.execute(
+        "SELECT registration_date, activation_date FROM users WHERE email = ?", (valid_email,)).fetchone()
+    conn.close()
+    assert isinstance(registration_date, int)
+    assert isinstance(activation_date, int)
+    assert activation_date >= registration_date
+
+def test_register_and_activate_users(temp_db_path):
+    """Test registration and activation of several users at once."""
+    users = [
+        ("first@example.com", "Password123!"),
+        ("invalidemail", "Password123!"),
+        ("second@example.com", "password"),
+        ("third@example.com", "Password456!"),
+        ("first@example.com", "Password789!"),
+    ]
+
+    create_database(temp_db_path)
+
+    # Test that each user gets the same outcome as with register_user
+    results = register_users(temp_db_path, users)
+    assert results == [
+        (True, "Registration successful"),
+        (False, "Invalid email format"),
+        (False, "Password should contain at least one digit and one special character."),
+        (True, "Registration successful"),
+        (False, "Email already registered"),
+    ]
+
+    # Test that each account gets the same outcome as with activate_user
+    results = activate_users(temp_db_path, ["first@example.com", "nonexistent@example.com", "third@example.com"])
+    assert results == [(True, "User activated"), (False, "User not found"), (True, "User activated")]
+
+    # Test that the registered users can authenticate with their own passwords
+    success, message = authenticate_user(temp_db_path, "first@example.com", "Password123!")
+    assert success, "Authentication should be successful for a user registered in bulk"
+    success, message = authenticate_user(temp_db_path, "third@example.com", "Password456!")
+    assert success, "Authentication should be successful for a user registered in bulk"
+
 def test_authenticate_user(temp_db_path):
     """Test user authentication."""
     valid_email = "authuser@example.com"
@@ -130,9 +395,16 @@ def test_authenticate_user(temp_db_path):
     invalid_email = "nonexistent@example.com"
     invalid_password = "WrongPassword"
 
-    # Pre-setup: Register and activate a new user
+    # Pre-setup: Register a new user
     create_database(temp_db_path)
     register_user(temp_db_path, valid_email, valid_password)
+
+    # Test authentication before activation
+    success, message = authenticate_user(temp_db_path, valid_email, valid_password)
+    assert not success, "Authentication should fail before the account is activated"
+    assert message == "Invalid credentials or account not activated"
+
+    # Activate the user
     activate_user(temp_db_path, valid_email)
 
     # Test authentication with invalid email
@@ -150,6 +422,37 @@ def test_authenticate_user(temp_db_path):
     assert success, "Authentication should be successful with correct credentials"
     assert message == "Authentication successful"
 
+    # Test authentication with the email in a different case
+    success, message = authenticate_user(temp_db_path, valid_email.upper(), valid_password)
+    assert success, "Authentication should be successful regardless of the email case"
+
+    # Test repeated authentication served from the authentication cache
+    success, message = authenticate_user(temp_db_path, valid_email, valid_password)
+    assert success, "Repeated authentication should be successful with correct credentials"
+
+    # Test authentication with wrong password after a successful login
+    success, message = authenticate_user(temp_db_path, valid_email, invalid_password)
+    assert not success, "Authentication should fail with wrong password after a successful login"
+
+def test_make_authenticator(temp_db_path):
+    """Test authentication through a function bound to the database."""
+    valid_email = "bounduser@example.com"
+    valid_password = "Password123!"
+
+    # Pre-setup: Register and activate a new user
+    create_database(temp_db_path)
+    register_user(temp_db_path, valid_email, valid_password)
+    activate_user(temp_db_path, valid_email)
+
+    authenticate = make_authenticator(temp_db_path)
+
+    # Test that the bound function gives the same results as authenticate_user
+    assert authenticate("nonexistent@example.com", valid_password) == (
+        False, "Invalid credentials or account not activated")
+    assert authenticate(valid_email, "WrongPassword") == (False, "Invalid credentials or account not activated")
+    assert authenticate(valid_email, valid_password) == (True, "Authentication successful")
+    assert authenticate(valid_email, valid_password) == (True, "Authentication successful")
+
 def test_reset_password(temp_db_path):
     """Test password reset."""
     valid_email = "resetuser@example.com"
@@ -173,9 +476,31 @@ def test_reset_password(temp_db_path):
     assert not success, "Reset should fail with invalid new password"
     assert message == "Password should contain at least one digit and one special character."
 
+    # Authenticate once so the old password is cached
+    success, message = authenticate_user(temp_db_path, valid_email, old_password)
+    assert success, "Authentication should be successful with the old password before reset"
+
     # Test successful password reset
     success, message = reset_password(temp_db_path, valid_email, new_password)
     assert success, "Reset should be successful with valid new password"
     assert message == "Password reset successfully"
 
+    # Test that only the new password is accepted after reset
+    success, message = authenticate_user(temp_db_path, valid_email, old_password)
+    assert not success, "Authentication should fail with the old password after reset"
+    success, message = authenticate_user(temp_db_path, valid_email, new_password)
+    assert success, "Authentication should be successful with the new password after reset"
+
+def test_close_connections(temp_db_path):
+    """Test that closing the shared connections does not lose data."""
+    email = "pooleduser@example.com"
+    password = "Password123!"
+
+    create_database(temp_db_path)
+    register_user(temp_db_path, email, password)
+    activate_user(temp_db_path, email)
 
+    # Test that the database is reopened transparently after closing the connections
+    close_connections()
+    success, message = authenticate_user(temp_db_path, email, password)
+    assert success, "Authentication should be successful after the connections are reopened"
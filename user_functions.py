@@ -1,52 +1,250 @@
 import sqlite3
 import hashlib
+import hmac
+import os
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeAlias
+
+# Anything accepted as a database path: a string or a path-like object such as pathlib.Path
+DbPath: TypeAlias = "str | os.PathLike[str]"
+
+# Character searches used by `is_valid_password`, compiled once at import
+_PW_DIGIT = re.compile(r"[0-9]").search
+_PW_SPEC = re.compile(r"[!@#$%^&*(),.?\":{}|<>]").search
+
+# Email format accepted by `is_valid_email`, compiled once at import
+_EMAIL_MATCH = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}").match
+
+# Number of random bytes used as the per-user salt for password hashing
+SALT_SIZE = 16
+
+# Maximum number of recently authenticated users kept in the authentication cache
+AUTH_CACHE_SIZE = 1024
+
+# Random per-process key for the fast hashes stored in the authentication cache
+_AUTH_CACHE_KEY = os.urandom(16)
+
+# Maps an email key to (fast_hash, stored_hash) for recent successful authentications
+_auth_cache: OrderedDict[bytes, tuple[bytes, bytes]] = OrderedDict()
+_auth_cache_lock = threading.Lock()
+
+# Version of the database schema created by `create_database`, stored in the database's user_version
+SCHEMA_VERSION = 1
+
+# SQL statements run by this module. Keeping the text constant lets sqlite3's statement cache reuse their
+# prepared statements; values are always bound as parameters, never formatted into the SQL.
+_USERS_COLUMNS = '''(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL,
+        email_key BLOB NOT NULL,
+        password BLOB NOT NULL,
+        salt BLOB NULL,
+        is_active BOOLEAN NOT NULL DEFAULT FALSE,
+        registration_date INTEGER NOT NULL DEFAULT (unixepoch()),
+        activation_date INTEGER NULL
+    )'''
+_SQL_CREATE_TABLE = "CREATE TABLE IF NOT EXISTS users " + _USERS_COLUMNS
+_SQL_CREATE_EMAIL_KEY_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_key ON users (email_key)"
+_SQL_INSERT_USER = ("INSERT INTO users (email, email_key, password, salt, is_active) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(email_key) DO NOTHING RETURNING id")
+_SQL_ACTIVATE = ("UPDATE users SET is_active = ?, activation_date = unixepoch() "
+                 "WHERE email_key = ? AND email = ? COLLATE NOCASE RETURNING id")
+_SQL_LOOKUP_AUTH = ("SELECT password, salt FROM users "
+                    "WHERE email_key = ? AND email = ? COLLATE NOCASE AND is_active = 1")
+_SQL_UPDATE_PW = ("UPDATE users SET password = ?, salt = ? "
+                  "WHERE email_key = ? AND email = ? COLLATE NOCASE RETURNING id")
+_SQL_UPGRADE_LEGACY_PW = ("UPDATE users SET password = ?, salt = ? "
+                          "WHERE email_key = ? AND email = ? COLLATE NOCASE AND salt IS NULL")
+_SQL_GET_SCHEMA_VERSION = "PRAGMA user_version"
+# PRAGMA values cannot be bound as parameters; the statement is built once from the constant, so its text never changes
+_SQL_SET_SCHEMA_VERSION = "PRAGMA user_version = %d" % SCHEMA_VERSION
+_SQL_USERS_TABLE_EXISTS = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+
+# Groups of legacy emails that differ only by case, which cannot all be kept under the case-insensitive email key
+_SQL_FIND_LEGACY_EMAIL_CONFLICTS = ("SELECT group_concat(email, ', ') FROM users "
+                                    "GROUP BY email_key(email) HAVING count(*) > 1")
+
+# Migration of a 'users' table created before schema versioning, when passwords were stored as unsalted SHA-256
+# hex digests and dates as TIMESTAMP text. The table is rebuilt with the current schema; migrated users keep their
+# SHA-256 digest (as bytes) with a NULL salt until their next successful login rehashes it with scrypt. The rebuild
+# follows the order documented by SQLite (create the new table, copy, drop the old one, rename the new one), so
+# foreign keys, views and triggers that refer to 'users' keep pointing at it. Indexes and triggers defined on the
+# legacy table are dropped with it, so they are saved beforehand and created again on the new table.
+_SQL_LEGACY_USERS_INDEXES_AND_TRIGGERS = ("SELECT sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+                                          "AND tbl_name = 'users' AND sql IS NOT NULL")
+_SQL_MIGRATE_LEGACY_USERS = (
+    "CREATE TABLE users_new " + _USERS_COLUMNS,
+    """
+    INSERT INTO users_new (id, email, email_key, password, salt, is_active, registration_date, activation_date)
+    SELECT id, email, email_key(email), legacy_digest(password), NULL, is_active,
+           coalesce(unixepoch(registration_date), unixepoch()), unixepoch(activation_date)
+    FROM users
+    """,
+    # Keep the AUTOINCREMENT counter, so that ids of deleted users are never reused
+    """
+    DELETE FROM sqlite_sequence
+    WHERE name = 'users_new' AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'users')
+    """,
+    "UPDATE sqlite_sequence SET name = 'users_new' WHERE name = 'users'",
+    "DROP TABLE users",
+    # Views and triggers still refer to the dropped 'users' by name; legacy mode renames without checking them
+    "PRAGMA legacy_alter_table = ON",
+    "ALTER TABLE users_new RENAME TO users",
+)
+_SQL_RESET_LEGACY_ALTER_TABLE = "PRAGMA legacy_alter_table = OFF"
+
+# Open database connections shared by all functions, keyed by database path. The lock serializes their use.
+_conn_pool: dict[str, sqlite3.Connection] = {}
+_conn_lock = threading.RLock()
+
+# Settings applied to every new connection: write-ahead logging so readers do not block the writer, fewer fsyncs,
+# temporary tables in memory, a 256 MB memory map and a 20 MB page cache
+_CONNECTION_PRAGMAS = '''
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 268435456;
+    PRAGMA cache_size = -20000;
+'''
+
+def _get_conn(db_path: DbPath) -> sqlite3.Connection:
+    """
+    Return the shared connection to the SQLite database at the given path, opening it on first use.
+
+    Reusing one connection per database avoids opening the file and parsing the schema on every call, and lets
+    sqlite3's per-connection statement cache reuse the prepared statements of the queries run by this module.
+    New connections are tuned with `_CONNECTION_PRAGMAS`, which also switches the database to WAL mode.
+    The connection may be used from any thread, so callers must hold `_conn_lock` while using it; `_connection`
+    takes care of this. If the connection cannot be set up, it is closed before the error is raised.
+
+    Parameters:
+    db_path (str): The file path of the SQLite database.
+
+    Returns:
+    sqlite3.Connection: The shared connection to the database.
+    """
+
+    key = os.fspath(db_path)
+    with _conn_lock:
+        conn = _conn_pool.get(key)
+        if conn is None:
+            conn = sqlite3.connect(key, check_same_thread=False)
+            try:
+                conn.executescript(_CONNECTION_PRAGMAS)
+            except BaseException:
+                conn.close()
+                raise
+            _conn_pool[key] = conn
+    return conn
+
+@contextmanager
+def _connection(db_path: DbPath) -> Iterator[sqlite3.Connection]:
+    """
+    Use the shared connection to the SQLite database at the given path for one transaction.
+
+    The connection lock is held for the whole block. When the block exits the transaction is committed, or rolled
+    back if an exception was raised. The connection itself stays open in the pool, so leaving the block only
+    releases it; no error path can leak a connection.
+
+    Parameters:
+    db_path (str): The file path of the SQLite database.
 
-def create_database(db_path):
+    Yields:
+    sqlite3.Connection: The shared connection to the database.
+    """
+
+    with _conn_lock:
+        conn = _get_conn(db_path)
+        with conn:
+            yield conn
+
+def close_connections() -> None:
+    """
+    Close all the shared database connections.
+
+    Connections are reopened automatically the next time a database is used. This is useful before deleting or
+    replacing a database file, and at application shutdown.
+    """
+
+    with _conn_lock:
+        for conn in _conn_pool.values():
+            conn.close()
+        _conn_pool.clear()
+
+def create_database(db_path: DbPath) -> None:
     """
     Create a SQLite database with a specific schema for user management.
 
-    This function establishes a connection to a SQLite database located at the specified path. If the database 
+    This function uses the shared connection to the SQLite database located at the specified path. If the database 
     does not exist, it is created. The function then defines and executes a SQL query to create a 'users' table 
     if it doesn't already exist. The 'users' table includes fields for id, email, password, activation status, 
-    registration date, and activation date. The email field is unique for each user. The function commits these 
-    changes to the database and then closes the connection.
+    registration date, and activation date, together with the per-user salt used to hash the password. Dates are 
+    stored as INTEGER Unix timestamps (seconds since the epoch). Users are looked up by 'email_key', a fixed-size 
+    8-byte hash of the email with ASCII letters lowercased (see `_email_key`) with a unique index, so the email is 
+    unique for each user regardless of ASCII case. The function then commits these changes to the database.
+
+    The schema version is tracked in the database's 'user_version'. A 'users' table created before schema
+    versioning is rebuilt in place with the current schema: emails get their key, dates are converted to Unix
+    timestamps, and the unsalted SHA-256 password hashes are kept with a NULL salt so that the users can still log
+    in; `authenticate_user` rehashes them with scrypt on their next successful login. The whole check and migration
+    run in one transaction, so a database is never left half-migrated and calling this function again is a no-op.
 
     Parameters:
     db_path (str): The file path where the SQLite database is stored or will be created.
 
+    Raises:
+    sqlite3.IntegrityError: If a legacy table holds emails that differ only by case. The error names the
+        conflicting emails and the database is left unchanged; merge or rename those users, then call this
+        function again.
+
     Note:
-    This function does not perform error handling for database connection issues or SQL execution errors.
+    This function does not handle database connection issues or SQL execution errors; they are raised to the
+    caller after the transaction has been rolled back.
     """
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Define schema
-    CREATE_TABLE_QUERY = '''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            is_active BOOLEAN NOT NULL DEFAULT FALSE,
-            registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            activation_date TIMESTAMP NULL
-        )
-    '''
-
-    # Create table with proper schema
-    cursor.execute(CREATE_TABLE_QUERY)
-    conn.commit()
-    conn.close()
-
-def is_valid_password(password):
+    with _connection(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute(_SQL_GET_SCHEMA_VERSION).fetchone()[0] >= SCHEMA_VERSION:
+            return
+
+        if conn.execute(_SQL_USERS_TABLE_EXISTS).fetchone():
+            # Rebuild a table created before schema versioning
+            conn.create_function("email_key", 1, _email_key, deterministic=True)
+            conn.create_function("legacy_digest", 1, bytes.fromhex, deterministic=True)
+            conflicts = [row[0] for row in conn.execute(_SQL_FIND_LEGACY_EMAIL_CONFLICTS)]
+            if conflicts:
+                raise sqlite3.IntegrityError(
+                    "Cannot migrate the users table: emails must be unique regardless of case, but these "
+                    "users conflict: " + "; ".join(conflicts))
+            dependents = [row[0] for row in conn.execute(_SQL_LEGACY_USERS_INDEXES_AND_TRIGGERS)]
+            try:
+                for statement in _SQL_MIGRATE_LEGACY_USERS:
+                    conn.execute(statement)
+            finally:
+                conn.execute(_SQL_RESET_LEGACY_ALTER_TABLE)
+            for statement in dependents:
+                conn.execute(statement)
+        else:
+            # Create table with proper schema
+            conn.execute(_SQL_CREATE_TABLE)
+
+        conn.execute(_SQL_CREATE_EMAIL_KEY_INDEX)
+        conn.execute(_SQL_SET_SCHEMA_VERSION)
+
+def is_valid_password(password: str) -> bool:
     """
     Check if the provided password meets certain complexity requirements.
 
     This function validates a password by checking if it contains at least one numeral and one special character.
     Special characters are defined as any of the following: !@#$%^&*(),.?":{}|<>.
     The function returns True if the password contains at least one of these special characters and at least one numeral.
-    Otherwise, it returns False. This validation helps ensure that the password is complex enough to provide better security.
+    Otherwise, it returns False. Both searches use regular expressions compiled once at import.
+    This validation helps ensure that the password is complex enough to provide better security.
 
     Parameters:
     password (str): The password to be validated.
@@ -56,16 +254,16 @@ def is_valid_password(password):
     """
 
     # Check for at least one number and one special character
-    if re.search(r"[0-9]", password) and re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+    if _PW_DIGIT(password) and _PW_SPEC(password):
         return True
     return False
 
-def is_valid_email(email):
+def is_valid_email(email: str) -> bool:
     """
     Check if the provided email address is valid.
 
-    This function uses a regular expression pattern to validate the format of an email address.
-    The pattern checks for a standard email format: one or more characters that can include
+    This function uses a regular expression pattern, compiled once at import, to validate the format of an email
+    address. The pattern checks for a standard email format: one or more characters that can include
     letters (a-z, A-Z), numbers (0-9), periods (.), underscores (_), percent signs (%), plus signs (+),
     and hyphens (-), followed by an '@' symbol, then more characters including letters and numbers, 
     periods, and hyphens, and finally, a period followed by a domain suffix of two or more letters.
@@ -78,38 +276,170 @@ def is_valid_email(email):
     """
 
     # Regex pattern for validating an email
-    pattern = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-    if re.match(pattern, email):
+    if _EMAIL_MATCH(email):
         return True
     return False
 
-def hash_password(password):
+def validate_batch(emails: Iterable[str], passwords: Iterable[str]) -> list[bool]:
+    """
+    Check several email and password pairs at once.
+
+    This function is intended for bulk operations such as batch imports and seed scripts. Each email is checked with
+    `is_valid_email` and the password at the same position with `is_valid_password`. Both validators run regular
+    expressions compiled once at import, so no just-in-time compiler is needed to keep the per-record cost low.
+
+    Parameters:
+    emails (iterable of str): The email addresses to be validated.
+    passwords (iterable of str): The passwords to be validated, in the same order as the emails.
+
+    Returns:
+    list: A list of booleans, True where both the email and the password are valid, False otherwise.
+
+    Raises:
+    ValueError: If the number of emails and passwords differ.
+    """
+
+    valid_email = is_valid_email
+    valid_password = is_valid_password
+    return [valid_email(email) and valid_password(password)
+            for email, password in zip(emails, passwords, strict=True)]
+
+def hash_password(password: str, salt: bytes) -> bytes:
     """
-    Hash a password using SHA-256 encryption.
+    Hash a password with a salt using the scrypt key derivation function.
 
-    This function takes a plaintext password and returns its hashed version using the SHA-256 hashing algorithm.
-    Hashing is a one-way process, useful for storing passwords securely. The output is a hexadecimal string
-    representation of the hashed password. As a security best practice, passwords should be hashed rather than
-    stored in plaintext.
+    This function takes a plaintext password and a salt and returns the hashed version of the password using
+    scrypt. Unlike a plain SHA-256 digest, scrypt is deliberately slow and memory-hard, which makes brute-force
+    attacks on GPUs impractical, and the per-user salt ensures that identical passwords produce different hashes.
+    The output is the raw 32-byte derived key, which is stored as is; convert it to hexadecimal only when it has to
+    be displayed or logged. As a security best practice, passwords should be hashed rather than stored in plaintext.
 
     Parameters:
     password (str): The plaintext password to be hashed.
+    salt (bytes): The random salt associated with the user.
 
     Returns:
-    str: The hashed password as a hexadecimal string.
+    bytes: The hashed password as 32 raw bytes.
     """
 
-    return hashlib.sha256(password.encode()).hexdigest()
+    return hashlib.scrypt(password.encode(), salt=salt, n=2**14, r=8, p=1, dklen=32)
 
-def register_user(db_path, email, password):
+def hash_passwords(passwords: Iterable[str]) -> list[tuple[bytes, bytes]]:
+    """
+    Hash several passwords at once, each with its own freshly generated salt.
+
+    This function is intended for bulk operations such as seed scripts and migrations. scrypt is memory-hard, so
+    it cannot be sped up by hashing several messages per SIMD register the way plain SHA-256 can; instead, since
+    hashlib releases the GIL while computing scrypt, the passwords are hashed concurrently on a thread pool with one
+    worker per CPU core. Each scrypt call uses about 16 MiB of memory, so the pool is not made any larger. The
+    results are returned in the same order as the input passwords.
+
+    Parameters:
+    passwords (iterable of str): The plaintext passwords to be hashed.
+
+    Returns:
+    list: A list of (salt, hashed_password) tuples, one for each password.
+    """
+
+    passwords = list(passwords)
+    if not passwords:
+        return []
+
+    salts = [os.urandom(SALT_SIZE) for _ in passwords]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        hashes = list(executor.map(hash_password, passwords, salts))
+    return list(zip(salts, hashes))
+
+def _email_key(email: str) -> bytes:
+    """
+    Compute the lookup key of an email address.
+
+    The key is the 8-byte BLAKE2b digest of the email with its ASCII letters lowercased. Indexing this fixed-size key
+    instead of the email text keeps the index small and makes each comparison during a lookup a short fixed-length
+    compare. Queries also check the email itself with `COLLATE NOCASE`, so a hash collision can never match the
+    wrong user. Only ASCII letters are folded, exactly like NOCASE, so that two emails share a key if and only if
+    they are equal under NOCASE.
+
+    Parameters:
+    email (str): The email address of the user.
+
+    Returns:
+    bytes: The 8-byte lookup key.
+    """
+
+    return hashlib.blake2b(email.encode().lower(), digest_size=8).digest()
+
+def _verify_password(user_key: bytes, password: str, salt: bytes | None, stored_hash: bytes) -> bool:
+    """
+    Check a password against the stored hash, using the authentication cache when possible.
+
+    Running scrypt on every login is expensive, so after a successful verification a fast keyed BLAKE2b hash of
+    the password is cached together with the stored hash. Later logins for the same user only need the fast hash,
+    as long as the stored hash has not changed in the meantime (for example after a password reset). On a cache
+    miss the password is verified with scrypt and the cache is updated. Users migrated from the legacy schema have
+    no salt and an unsalted SHA-256 hash, which is checked directly. All comparisons are constant-time.
+
+    Parameters:
+    user_key (bytes): The email key of the user being authenticated.
+    password (str): The password provided by the user.
+    salt (bytes or None): The salt stored for the user, None for a legacy SHA-256 hash.
+    stored_hash (bytes): The password hash stored for the user.
+
+    Returns:
+    bool: True if the password matches the stored hash, False otherwise.
+    """
+
+    if salt is None:
+        return hmac.compare_digest(hashlib.sha256(password.encode()).digest(), stored_hash)
+
+    fast_hash = hashlib.blake2b(password.encode(), key=_AUTH_CACHE_KEY).digest()
+
+    with _auth_cache_lock:
+        cached = _auth_cache.get(user_key)
+        if cached is not None and cached[1] == stored_hash and hmac.compare_digest(cached[0], fast_hash):
+            _auth_cache.move_to_end(user_key)
+            return True
+
+    if not hmac.compare_digest(hash_password(password, salt), stored_hash):
+        return False
+
+    with _auth_cache_lock:
+        _auth_cache[user_key] = (fast_hash, stored_hash)
+        _auth_cache.move_to_end(user_key)
+        if len(_auth_cache) > AUTH_CACHE_SIZE:
+            _auth_cache.popitem(last=False)
+    return True
+
+def _upgrade_legacy_password(db_path: DbPath, user_key: bytes, email: str, password: str) -> None:
+    """
+    Rehash the legacy SHA-256 password hash of a migrated user with scrypt.
+
+    This is called after a successful login with a legacy hash, when the plaintext password is available. The
+    update only applies while the user still has no salt, so it can never overwrite a password reset that happened
+    in the meantime.
+
+    Parameters:
+    db_path (str): The file path of the SQLite database.
+    user_key (bytes): The email key of the user.
+    email (str): The email address of the user.
+    password (str): The password the user has just authenticated with.
+    """
+
+    salt = os.urandom(SALT_SIZE)
+    hashed_password = hash_password(password, salt)
+    with _connection(db_path) as conn:
+        conn.execute(_SQL_UPGRADE_LEGACY_PW, (hashed_password, salt, user_key, email))
+
+def register_user(db_path: DbPath, email: str, password: str) -> tuple[bool, str]:
     """
     Register a new user in the database with their email and password.
 
     This function first validates the email and password using `is_valid_email` and `is_valid_password` functions.
-    If either is invalid, it returns False with an appropriate error message. If both are valid, it connects to 
-    the SQLite database at the specified path and checks if the email is already registered. If the email is unique, 
-    it inserts a new record into the 'users' table with the hashed password and sets 'is_active' to False by default.
-    Finally, it commits the changes to the database and closes the connection.
+    If either is invalid, it returns False with an appropriate error message. If both are valid, it uses the shared
+    connection to the SQLite database at the specified path and inserts a new record into the 'users' table with a
+    random salt and the salted password hash, and sets 'is_active' to False by default. A single
+    `INSERT ... ON CONFLICT DO NOTHING RETURNING` statement both checks that the email is not already registered
+    (ignoring case) and inserts the user. Finally, it commits the changes to the database.
 
     Parameters:
     db_path (str): The file path of the SQLite database.
@@ -127,32 +457,69 @@ def register_user(db_path, email, password):
     if not is_valid_password(password):
         return False, "Password should contain at least one digit and one special character."
     
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    salt = os.urandom(SALT_SIZE)
+    hashed_password = hash_password(password, salt)
 
-    # Check if email already exists
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    if cursor.fetchone():
-        conn.close()
-        return False, "Email already registered"
+    # Insert new user into db unless the email already exists
+    with _connection(db_path) as conn:
+        row = conn.execute(_SQL_INSERT_USER, (email, _email_key(email), hashed_password, salt, False)).fetchone()
 
-    # Insert new user into db
-    hashed_password = hash_password(password)
-    cursor.execute(f"INSERT INTO users (email, password, is_active) VALUES (?, ?, ?)",
-                   (email, hashed_password, False))
-    
-    conn.commit()
-    conn.close()
+    if row is None:
+        return False, "Email already registered"
     return True, "Registration successful"
 
-def activate_user(db_path, email):
+def register_users(db_path: DbPath, users: Iterable[tuple[str, str]]) -> list[tuple[bool, str]]:
+    """
+    Register several users in the database in a single transaction.
+
+    This function is intended for bulk operations such as seed scripts, migrations and test fixtures. Each email and
+    password is validated like in `register_user`. The passwords of the valid users are then hashed concurrently
+    with `hash_passwords`, and all the users are inserted inside one `BEGIN IMMEDIATE ... COMMIT` transaction, so
+    the database is synced to disk once for the whole batch instead of once per user. If an error occurs, the
+    transaction is rolled back and no user is registered.
+
+    Parameters:
+    db_path (str): The file path of the SQLite database.
+    users (iterable of tuple): The (email, password) pairs of the users to register.
+
+    Returns:
+    list: A list with one tuple per user, in the same order as the input, each containing a boolean and a string
+        message as returned by `register_user`.
+    """
+
+    users = list(users)
+    results: list[tuple[bool, str]] = []
+    pending: list[int] = []
+    for i, (email, password) in enumerate(users):
+        if not is_valid_email(email):
+            results.append((False, "Invalid email format"))
+        elif not is_valid_password(password):
+            results.append((False, "Password should contain at least one digit and one special character."))
+        else:
+            results.append((True, "Registration successful"))
+            pending.append(i)
+
+    hashed = hash_passwords(users[i][1] for i in pending)
+
+    # Insert all the new users in one transaction
+    with _connection(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for i, (salt, hashed_password) in zip(pending, hashed):
+            email = users[i][0]
+            row = conn.execute(_SQL_INSERT_USER, (email, _email_key(email), hashed_password, salt, False)).fetchone()
+            if row is None:
+                results[i] = (False, "Email already registered")
+
+    return results
+
+def activate_user(db_path: DbPath, email: str) -> tuple[bool, str]:
     """
     Activate a user's account in the database based on their email.
 
-    This function connects to the SQLite database and checks if a user with the given email exists. If the user
-    exists, it updates the 'is_active' field to True and sets the 'activation_date' to the current timestamp, 
-    indicating that the user's account is now active. It then commits these changes to the database and closes 
-    the connection.
+    This function uses the shared connection to the SQLite database to update the 'is_active' field of the user with
+    the given email to True and set the 'activation_date' to the current Unix timestamp, indicating that the 
+    user's account is now active. The `UPDATE ... RETURNING` statement reports whether such a user exists, so no
+    separate lookup is needed. It then commits these changes to the database.
 
     Parameters:
     db_path (str): The file path of the SQLite database.
@@ -163,30 +530,57 @@ def activate_user(db_path, email):
         False otherwise. The string contains a success message or an error message.
     """
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # Update the is_active field and set activation_date to current Unix timestamp
+    with _connection(db_path) as conn:
+        row = conn.execute(_SQL_ACTIVATE, (True, _email_key(email), email)).fetchone()
 
-    # Check if the user exists
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    if cursor.fetchone() is None:
-        conn.close()
+    if row is None:
         return False, "User not found"
-
-    # Update the is_active field and set activation_date to current timestamp
-    cursor.execute("UPDATE users SET is_active = ?, activation_date = CURRENT_TIMESTAMP WHERE email = ?",
-                   (True, email))
-    conn.commit()
-    conn.close()
     return True, "User activated"
 
-def authenticate_user(db_path, email, password):
+def activate_users(db_path: DbPath, emails: Iterable[str]) -> list[tuple[bool, str]]:
+    """
+    Activate several users' accounts in the database in a single transaction.
+
+    This function is intended for bulk operations such as seed scripts and test fixtures. Each account is activated
+    like in `activate_user`, but all the updates run inside one `BEGIN IMMEDIATE ... COMMIT` transaction, so the
+    database is synced to disk once for the whole batch instead of once per user. If an error occurs, the
+    transaction is rolled back and no account is activated.
+
+    Parameters:
+    db_path (str): The file path of the SQLite database.
+    emails (iterable of str): The email addresses of the users whose accounts are to be activated.
+
+    Returns:
+    list: A list with one tuple per email, in the same order as the input, each containing a boolean and a string
+        message as returned by `activate_user`.
+    """
+
+    results: list[tuple[bool, str]] = []
+
+    # Activate all the users in one transaction
+    with _connection(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for email in emails:
+            row = conn.execute(_SQL_ACTIVATE, (True, _email_key(email), email)).fetchone()
+            if row is None:
+                results.append((False, "User not found"))
+            else:
+                results.append((True, "User activated"))
+
+    return results
+
+def authenticate_user(db_path: DbPath, email: str, password: str) -> tuple[bool, str]:
     """
     Authenticate a user by verifying their email and password.
 
-    This function connects to the SQLite database to retrieve the stored hashed password and the activation status
-    for the given email. It then compares the provided password, after hashing it, with the stored hashed password.
-    If they match and the account is activated ('is_active' is True), the authentication is successful. The function
-    closes the database connection before returning.
+    This function uses the shared connection to the SQLite database to retrieve the stored hashed password and the
+    salt for the given email. Only activated accounts ('is_active' is True) are selected, so unknown and inactive
+    users are rejected by SQLite without a row being returned. It then compares the provided password, after hashing
+    it with the user's salt, with the stored hashed password using a constant-time comparison. If they match, the
+    authentication is successful. Recently authenticated users are kept in an in-memory cache so that
+    repeated logins do not have to run the expensive key derivation again. Users migrated from the legacy schema
+    have their unsalted SHA-256 hash replaced with a salted scrypt hash on their first successful login.
 
     Parameters:
     db_path (str): The file path of the SQLite database.
@@ -198,24 +592,62 @@ def authenticate_user(db_path, email, password):
         False otherwise. The string contains a success message or an error message.
     """
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    user_key = _email_key(email)
+    with _connection(db_path) as conn:
+        result = conn.execute(_SQL_LOOKUP_AUTH, (user_key, email)).fetchone()
 
-    cursor.execute("SELECT password, is_active FROM users WHERE email = ?", (email,))
-    result = cursor.fetchone()
-    if result and hash_password(password) == result[0] and result[1]:
+    if result and _verify_password(user_key, password, result[1], result[0]):
+        if result[1] is None:
+            _upgrade_legacy_password(db_path, user_key, email, password)
         return True, "Authentication successful"
-    
-    conn.close()
+
     return False, "Invalid credentials or account not activated"
 
-def reset_password(db_path, email, new_password):
+def make_authenticator(db_path: DbPath) -> Callable[[str, str], tuple[bool, str]]:
+    """
+    Create an authentication function bound to a database, for callers that authenticate users repeatedly.
+
+    The returned function behaves like `authenticate_user` without the `db_path` argument. The shared connection,
+    its lock, the lookup query and the helpers are resolved once here and captured by the returned function, so
+    each call only computes the email key, runs the lookup and verifies the password (from the authentication
+    cache for recently authenticated users). Keep the returned function and reuse it; create a new one after
+    calling `close_connections`, since it holds on to the connection that was open when it was created.
+
+    Parameters:
+    db_path (str): The file path of the SQLite database.
+
+    Returns:
+    callable: A function taking an email and a password and returning the same tuple as `authenticate_user`.
+    """
+
+    execute = _get_conn(db_path).execute
+    lock = _conn_lock
+    query = _SQL_LOOKUP_AUTH
+    email_key = _email_key
+    verify_password = _verify_password
+
+    def authenticate(email: str, password: str) -> tuple[bool, str]:
+        user_key = email_key(email)
+        with lock:
+            result = execute(query, (user_key, email)).fetchone()
+
+        if result and verify_password(user_key, password, result[1], result[0]):
+            if result[1] is None:
+                _upgrade_legacy_password(db_path, user_key, email, password)
+            return True, "Authentication successful"
+
+        return False, "Invalid credentials or account not activated"
+
+    return authenticate
+
+def reset_password(db_path: DbPath, email: str, new_password: str) -> tuple[bool, str]:
     """
     Reset the password for a user in the database.
 
-    This function connects to the SQLite database and checks if a user with the specified email exists. If the user
-    exists, it updates their password with the new password provided, after hashing it. The function then commits
-    these changes to the database and closes the connection.
+    This function hashes the new password with a freshly generated salt and uses the shared connection to the SQLite
+    database to update the password of the user with the specified email. The `UPDATE ... RETURNING` statement
+    reports whether such a user exists, so no separate lookup is needed. The function then commits these changes to
+    the database and drops the user from the authentication cache.
 
     Parameters:
     db_path (str): The file path of the SQLite database.
@@ -230,20 +662,19 @@ def reset_password(db_path, email, new_password):
     if not is_valid_password(new_password):
         return False, "Password should contain at least one digit and one special character."
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    salt = os.urandom(SALT_SIZE)
+    hashed_password = hash_password(new_password, salt)
 
-    # Check if the user exists
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    if cursor.fetchone() is None:
-        conn.close()
+    # Update the password
+    user_key = _email_key(email)
+    with _connection(db_path) as conn:
+        row = conn.execute(_SQL_UPDATE_PW, (hashed_password, salt, user_key, email)).fetchone()
+
+    if row is None:
         return False, "User not found"
 
-    # Update the password
-    hashed_password = hash_password(new_password)
-    cursor.execute("UPDATE users SET password = ? WHERE email = ?", (hashed_password, email))
-    conn.commit()
-    conn.close()
+    with _auth_cache_lock:
+        _auth_cache.pop(user_key, None)
     return True, "Password reset successfully"
 
 if __name__ == '__main__':